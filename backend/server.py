@@ -4,23 +4,31 @@ A cloud-based control interface for Resolume Arena & Avenue
 
 Architecture:
 - FastAPI with async MongoDB (motor)
-- JWT authentication with bcrypt password hashing
+- JWT authentication with argon2id (bcrypt-compatible) password hashing
 - Proxy layer to Resolume REST API via ngrok
 """
 
 import os
 import sys
+import time
+import asyncio
 import logging
+import functools
 from contextlib import asynccontextmanager
 from typing import Optional
 
 from fastapi import FastAPI, HTTPException, Request, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, EmailStr
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import InsertOne, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError
 from passlib.context import CryptContext
 import jwt
 import httpx
+import orjson
+from cachetools import LRUCache, TTLCache
 from datetime import datetime, timedelta, timezone
 from uuid import uuid4
 
@@ -35,10 +43,14 @@ class Config:
     """Application configuration from environment variables."""
     MONGO_URL: str = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
     DB_NAME: str = os.environ.get("DB_NAME", "resofleur")
+    MONGO_MAX_POOL_SIZE: int = int(os.environ.get("MONGO_MAX_POOL_SIZE", "50"))
+    MONGO_MIN_POOL_SIZE: int = int(os.environ.get("MONGO_MIN_POOL_SIZE", "10"))
+    MONGO_COMPRESSORS: str = os.environ.get("MONGO_COMPRESSORS", "zstd,snappy")
     JWT_SECRET: str = os.environ.get("JWT_SECRET_KEY", "dev-secret-change-in-prod")
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRATION_HOURS: int = 24
     CORS_ORIGINS: list = ["*"]
+    DEBUG_ROUTES: bool = os.environ.get("ENABLE_DEBUG_ROUTES", "").lower() in ("1", "true", "yes")
 
 config = Config()
 
@@ -58,26 +70,38 @@ logger = logging.getLogger("resofleur")
 # =============================================================================
 
 class Database:
-    """MongoDB connection manager."""
+    """MongoDB connection manager (connected once in lifespan)."""
     _instance: Optional["Database"] = None
-    _db = None
+    client: Optional[AsyncIOMotorClient] = None
+    db = None
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
     
-    @property
-    def db(self):
-        if self._db is None:
-            client = AsyncIOMotorClient(
+    def connect(self):
+        if self.client is None:
+            self.client = AsyncIOMotorClient(
                 config.MONGO_URL,
                 serverSelectionTimeoutMS=10000,
-                connectTimeoutMS=10000
+                connectTimeoutMS=10000,
+                maxPoolSize=config.MONGO_MAX_POOL_SIZE,
+                minPoolSize=config.MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=60000,
+                waitQueueTimeoutMS=5000,
+                compressors=config.MONGO_COMPRESSORS
             )
-            self._db = client[config.DB_NAME]
+            self.db = self.client[config.DB_NAME]
             logger.info(f"Connected to MongoDB: {config.DB_NAME}")
-        return self._db
+        return self.db
+    
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+            self.db = None
+            logger.info("MongoDB connection closed")
 
 class HttpClient:
     """HTTP client for Resolume proxy requests."""
@@ -92,23 +116,184 @@ class HttpClient:
     @property
     def client(self) -> httpx.AsyncClient:
         if self._client is None:
-            self._client = httpx.AsyncClient(timeout=10.0, verify=False)
+            self._client = httpx.AsyncClient(
+                http2=True,
+                timeout=10.0,
+                verify=False,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=50,
+                    keepalive_expiry=30
+                )
+            )
         return self._client
+    
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
 db = Database()
 http = HttpClient()
 
+async def ensure_indexes():
+    """Create indexes backing the email/id/user_id lookups."""
+    await db.db.users.create_index("email", unique=True)
+    await db.db.users.create_index("id", unique=True)
+    # Covers the active-config lookup so it is answered from the index alone
+    await db.db.configurations.create_index(
+        [("user_id", 1), ("is_active", 1), ("host", 1), ("port", 1),
+         ("name", 1), ("id", 1), ("created_at", 1)],
+        name="cfg_covered"
+    )
+    await db.db.configurations.create_index("id", unique=True)
+
+# =============================================================================
+# CACHES
+# =============================================================================
+
+# User profiles keyed by JWT `sub` (staleness bounded by the TTL); active
+# configs keyed by user_id, invalidated explicitly on config writes.
+_user_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+_config_cache: TTLCache = TTLCache(maxsize=10_000, ttl=3)
+_MISSING = object()  # None is a valid cached config ("no active config")
+# Bumped on config invalidation while a lookup is in flight so it can't re-cache
+# stale data; cleared whenever no lookup is in flight, so it stays small
+_config_generation: dict[str, int] = {}
+
+async def get_user_cached(user_id: str) -> Optional[dict]:
+    """Get a user profile (without password hash), cached per user id."""
+    user = _user_cache.get(user_id)
+    if user is not None:
+        return user
+    user = await db.db.users.find_one({"id": user_id}, {"_id": 0, "hashed_password": 0})
+    if user:
+        _user_cache[user_id] = user
+    return user
+
+# Exactly the fields of cfg_covered, so active-config reads are covered queries
+CONFIG_PROJECTION = {
+    "_id": 0, "user_id": 1, "is_active": 1, "host": 1, "port": 1,
+    "name": 1, "id": 1, "created_at": 1
+}
+
+class ConfigLoader:
+    """Coalesces concurrent active-config lookups into a single `$in` query."""
+    
+    def __init__(self, window: float = 0.002):
+        self._window = window
+        self._pending: dict[str, asyncio.Future] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self.inflight = 0
+    
+    async def load(self, user_id: str) -> Optional[dict]:
+        """Get a user's active Resolume config (cached for a few seconds)."""
+        cfg = _config_cache.get(user_id, _MISSING)
+        if cfg is not _MISSING:
+            return cfg
+        
+        fut = self._pending.get(user_id)
+        if fut is None:
+            fut = asyncio.get_running_loop().create_future()
+            self._pending[user_id] = fut
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush())
+        # Shield so one cancelled request doesn't cancel the shared lookup
+        return await asyncio.shield(fut)
+    
+    async def _flush(self):
+        await asyncio.sleep(self._window)
+        pending, self._pending = self._pending, {}
+        self._flush_task = None
+        # Snapshot before querying; a write that invalidates during the await
+        # bumps the generation and the (possibly stale) result isn't cached
+        generations = {user_id: _config_generation.get(user_id, 0) for user_id in pending}
+        self.inflight += 1
+        
+        try:
+            docs = await db.db.configurations.find(
+                {"user_id": {"$in": list(pending)}, "is_active": True},
+                CONFIG_PROJECTION
+            ).to_list(None)
+        except Exception as e:
+            for fut in pending.values():
+                if not fut.done():
+                    fut.set_exception(e)
+                    # Mark retrieved: waiters that were cancelled never read it
+                    fut.exception()
+            return
+        else:
+            by_user = {d["user_id"]: d for d in docs}
+            for user_id in pending:
+                if _config_generation.get(user_id, 0) == generations[user_id]:
+                    _config_cache[user_id] = by_user.get(user_id)
+            for user_id, fut in pending.items():
+                if not fut.done():
+                    fut.set_result(by_user.get(user_id))
+        finally:
+            self.inflight -= 1
+            if not self.inflight:
+                _config_generation.clear()
+
+config_loader = ConfigLoader()
+
+def invalidate_config_cache(user_id: str):
+    # Only in-flight lookups hold a generation snapshot
+    if config_loader.inflight:
+        _config_generation[user_id] = _config_generation.get(user_id, 0) + 1
+    _config_cache.pop(user_id, None)
+    # A different active config may point at a different composition
+    for key in [k for k in _param_id_cache if k[0] == user_id]:
+        _param_id_cache.pop(key, None)
+
+# Thumbnail bytes keyed by (host, layer, clip); Resolume rarely changes them.
+# Bounded by total bytes, and only small bodies of known length are cached.
+THUMBNAIL_CACHE_MAX_ITEM = 256 * 1024
+_thumbnail_cache: TTLCache = TTLCache(
+    maxsize=32 * 1024 * 1024, ttl=15, getsizeof=lambda v: len(v[0])
+)
+
+# Resolume parameter IDs keyed by (user_id, parameter path). IDs are stable
+# for a loaded composition, so these only go stale on a 404 or config change.
+_param_id_cache: LRUCache = LRUCache(maxsize=1024)
+
+# =============================================================================
+# CLOCK
+# =============================================================================
+
+# Second-precision UTC timestamp for `created_at` fields, refreshed by a
+# background task. Not used for JWT expiry, which needs exact time.
+NOW_ISO: str = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+
+async def _tick():
+    global NOW_ISO
+    while True:
+        await asyncio.sleep(1)
+        NOW_ISO = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+
 # =============================================================================
 # SECURITY
 # =============================================================================
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# argon2id for new hashes; existing bcrypt hashes still verify
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    default="argon2",
+    deprecated="auto",
+    argon2__memory_cost=19456,
+    argon2__time_cost=2
+)
+
+# Hashing is CPU-bound: run it off the event loop and cap concurrent work
+_hash_semaphore = asyncio.Semaphore((os.cpu_count() or 1) * 2)
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+async def hash_password(password: str) -> str:
+    async with _hash_semaphore:
+        return await asyncio.to_thread(pwd_context.hash, password)
 
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+async def verify_password(plain: str, hashed: str) -> bool:
+    async with _hash_semaphore:
+        return await asyncio.to_thread(pwd_context.verify, plain, hashed)
 
 def create_access_token(user_id: str, email: str) -> str:
     payload = {
@@ -118,15 +303,25 @@ def create_access_token(user_id: str, email: str) -> str:
     }
     return jwt.encode(payload, config.JWT_SECRET, algorithm=config.JWT_ALGORITHM)
 
+# Verified payloads keyed by raw token; `exp` is re-checked on every hit
+_token_cache: TTLCache = TTLCache(maxsize=4096, ttl=60)
+_JWT_ALGORITHMS = [config.JWT_ALGORITHM]
+_JWT_OPTIONS = {"verify_signature": True, "require": ["exp"]}
+
 async def get_current_user(request: Request) -> dict:
     """Dependency: Extract and validate JWT from Authorization header."""
     auth_header = request.headers.get("Authorization")
     if not auth_header or not auth_header.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    token = auth_header.split(" ")[1]
+    token = auth_header[7:]
+    payload = _token_cache.get(token)
+    if payload is not None and payload["exp"] > time.time():
+        return payload
+    
     try:
-        payload = jwt.decode(token, config.JWT_SECRET, algorithms=[config.JWT_ALGORITHM])
+        payload = jwt.decode(token, config.JWT_SECRET, algorithms=_JWT_ALGORITHMS, options=_JWT_OPTIONS)
+        _token_cache[token] = payload
         return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
@@ -165,14 +360,53 @@ class AuthResponse(BaseModel):
 async def lifespan(app: FastAPI):
     """Application lifecycle management."""
     logger.info(f"🌸 Resofleur v{VERSION} starting...")
+    
+    # Single shared Motor client for the whole process
+    db.connect()
+    app.state.mongo = db.client
+    app.state.db = db.db
+    
+    # Warm the connection pool so the first request skips the handshake
+    try:
+        await db.db.command("ping")
+        logger.info("MongoDB connection pool warmed")
+        # zstd wire compression needs MongoDB 4.2+; older servers fall back to snappy
+        server_version = (await db.client.server_info()).get("version", "unknown")
+        logger.info(f"MongoDB {server_version}, requested compressors: {config.MONGO_COMPRESSORS}")
+    except Exception as e:
+        logger.warning(f"MongoDB ping failed at startup: {e}")
+    
+    try:
+        await ensure_indexes()
+        logger.info("MongoDB indexes ensured")
+    except Exception as e:
+        logger.warning(f"MongoDB index creation failed: {e}")
+    
+    # Pay hashing backend detection and JWT setup before the first login
+    await verify_password("warmup", await hash_password("warmup"))
+    jwt.decode(
+        create_access_token("warmup", "warmup@resofleur"),
+        config.JWT_SECRET, algorithms=_JWT_ALGORITHMS, options=_JWT_OPTIONS
+    )
+    logger.info("Password hashing and JWT warmed")
+    
+    if config.DEBUG_ROUTES:
+        app.state.routes_snapshot = build_routes_snapshot()
+    
+    # Started last so a failing startup step can't leak the task
+    clock_task = asyncio.create_task(_tick())
     yield
     logger.info("Shutting down...")
+    clock_task.cancel()
+    await http.close()
+    db.close()
 
 app = FastAPI(
     title="Resofleur API",
     description="Cloud-based control interface for Resolume",
     version=VERSION,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # =============================================================================
@@ -180,26 +414,29 @@ app = FastAPI(
 # =============================================================================
 
 ALLOWED_HEADERS = "Content-Type, Authorization, Accept, Origin, X-Requested-With, ngrok-skip-browser-warning"
+ALLOWED_METHODS = "GET, POST, PUT, DELETE, OPTIONS, PATCH"
+
+# Built once at import; the middleware only copies these onto responses
+_PREFLIGHT_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": ALLOWED_METHODS,
+    "Access-Control-Allow-Headers": ALLOWED_HEADERS,
+    "Access-Control-Max-Age": "86400",
+}
+_CORS_HEADERS = (
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-methods", ALLOWED_METHODS.encode("latin-1")),
+    (b"access-control-allow-headers", ALLOWED_HEADERS.encode("latin-1")),
+)
 
 @app.middleware("http")
 async def cors_middleware(request: Request, call_next):
     """Custom CORS middleware with preflight handling."""
     if request.method == "OPTIONS":
-        return Response(
-            content="",
-            status_code=200,
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS, PATCH",
-                "Access-Control-Allow-Headers": ALLOWED_HEADERS,
-                "Access-Control-Max-Age": "86400",
-            }
-        )
+        return Response(content="", status_code=200, headers=_PREFLIGHT_HEADERS)
     
     response = await call_next(request)
-    response.headers["Access-Control-Allow-Origin"] = "*"
-    response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS, PATCH"
-    response.headers["Access-Control-Allow-Headers"] = ALLOWED_HEADERS
+    response.headers.raw.extend(_CORS_HEADERS)
     return response
 
 # =============================================================================
@@ -210,8 +447,8 @@ async def cors_middleware(request: Request, call_next):
 def root():
     return {"service": "resofleur", "version": VERSION, "status": "running"}
 
-@app.get("/health")
-@app.get("/api/health")
+@app.api_route("/health", methods=["GET", "HEAD"])
+@app.api_route("/api/health", methods=["GET", "HEAD"])
 def health():
     return {"status": "ok", "version": VERSION}
 
@@ -222,7 +459,8 @@ def health():
 @app.post("/api/auth/register", response_model=AuthResponse)
 async def register(req: RegisterRequest):
     """Create a new user account."""
-    existing = await db.db.users.find_one({"email": req.email})
+    # Cheap existence check before hashing; the unique index catches races
+    existing = await db.db.users.find_one({"email": req.email}, {"_id": 1})
     if existing:
         raise HTTPException(status_code=409, detail="Email already registered")
     
@@ -230,12 +468,15 @@ async def register(req: RegisterRequest):
     user_doc = {
         "id": user_id,
         "email": req.email,
-        "hashed_password": hash_password(req.password),
+        "hashed_password": await hash_password(req.password),
         "full_name": req.full_name,
         "subscription_tier": "free",
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": NOW_ISO
     }
-    await db.db.users.insert_one(user_doc)
+    try:
+        await db.db.users.insert_one(user_doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Email already registered")
     
     token = create_access_token(user_id, req.email)
     user_response = {k: v for k, v in user_doc.items() if k not in ["_id", "hashed_password"]}
@@ -246,8 +487,12 @@ async def register(req: RegisterRequest):
 @app.post("/api/auth/login", response_model=AuthResponse)
 async def login(req: LoginRequest):
     """Authenticate and return access token."""
-    user = await db.db.users.find_one({"email": req.email})
-    if not user or not verify_password(req.password, user["hashed_password"]):
+    user = await db.db.users.find_one(
+        {"email": req.email},
+        {"_id": 0, "id": 1, "email": 1, "hashed_password": 1, "full_name": 1,
+         "subscription_tier": 1, "created_at": 1}
+    )
+    if not user or not await verify_password(req.password, user["hashed_password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     token = create_access_token(user["id"], user["email"])
@@ -259,7 +504,7 @@ async def login(req: LoginRequest):
 @app.get("/api/auth/me")
 async def get_me(current_user: dict = Depends(get_current_user)):
     """Get current user profile."""
-    user = await db.db.users.find_one({"id": current_user["sub"]}, {"_id": 0, "hashed_password": 0})
+    user = await get_user_cached(current_user["sub"])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -271,10 +516,7 @@ async def get_me(current_user: dict = Depends(get_current_user)):
 @app.get("/api/resolume/config")
 async def get_config(current_user: dict = Depends(get_current_user)):
     """Get user's active Resolume configuration."""
-    config_doc = await db.db.configurations.find_one(
-        {"user_id": current_user["sub"], "is_active": True},
-        {"_id": 0}
-    )
+    config_doc = await config_loader.load(current_user["sub"])
     return config_doc or {}
 
 @app.get("/api/resolume/configs")
@@ -291,12 +533,6 @@ async def create_config(cfg: ResolumeConfigCreate, current_user: dict = Depends(
     """Create a new Resolume configuration."""
     user_id = current_user["sub"]
     
-    # Deactivate existing configs
-    await db.db.configurations.update_many(
-        {"user_id": user_id},
-        {"$set": {"is_active": False}}
-    )
-    
     config_doc = {
         "id": str(uuid4()),
         "user_id": user_id,
@@ -304,9 +540,14 @@ async def create_config(cfg: ResolumeConfigCreate, current_user: dict = Depends(
         "host": cfg.host,
         "port": cfg.port,
         "is_active": True,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": NOW_ISO
     }
-    await db.db.configurations.insert_one(config_doc)
+    # Deactivate existing configs and insert the new one in a single round trip
+    await db.db.configurations.bulk_write([
+        UpdateMany({"user_id": user_id}, {"$set": {"is_active": False}}),
+        InsertOne(config_doc)
+    ], ordered=True)
+    invalidate_config_cache(user_id)
     
     return {k: v for k, v in config_doc.items() if k != "_id"}
 
@@ -319,6 +560,7 @@ async def delete_config(config_id: str, current_user: dict = Depends(get_current
     })
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Configuration not found")
+    invalidate_config_cache(current_user["sub"])
     return {"success": True}
 
 @app.put("/api/resolume/config/{config_id}/activate")
@@ -327,13 +569,16 @@ async def activate_config(config_id: str, current_user: dict = Depends(get_curre
     user_id = current_user["sub"]
     
     # Verify ownership
-    cfg = await db.db.configurations.find_one({"id": config_id, "user_id": user_id})
+    cfg = await db.db.configurations.find_one({"id": config_id, "user_id": user_id}, {"_id": 1})
     if not cfg:
         raise HTTPException(status_code=404, detail="Configuration not found")
     
     # Deactivate all, activate selected
-    await db.db.configurations.update_many({"user_id": user_id}, {"$set": {"is_active": False}})
-    await db.db.configurations.update_one({"id": config_id}, {"$set": {"is_active": True}})
+    await db.db.configurations.bulk_write([
+        UpdateMany({"user_id": user_id}, {"$set": {"is_active": False}}),
+        UpdateOne({"id": config_id}, {"$set": {"is_active": True}})
+    ], ordered=True)
+    invalidate_config_cache(user_id)
     
     return {"success": True}
 
@@ -341,12 +586,22 @@ async def activate_config(config_id: str, current_user: dict = Depends(get_curre
 # RESOLUME PROXY LAYER
 # =============================================================================
 
+# Shared by every proxy hop; values don't depend on the user
+RESOLUME_HEADERS = {
+    "ngrok-skip-browser-warning": "true",
+    "Content-Type": "application/json",
+    "Accept": "application/json"
+}
+NGROK_HEADERS = {"ngrok-skip-browser-warning": "true"}
+
+@functools.lru_cache(maxsize=1024)
+def resolume_base_url(host: str, port: int) -> str:
+    """Base URL for a Resolume instance (ngrok uses HTTPS on 443)."""
+    return f"https://{host}" if port == 443 else f"http://{host}:{port}"
+
 async def get_user_config(user_id: str) -> dict:
     """Get active Resolume config for user."""
-    cfg = await db.db.configurations.find_one(
-        {"user_id": user_id, "is_active": True},
-        {"_id": 0}
-    )
+    cfg = await config_loader.load(user_id)
     if not cfg:
         raise HTTPException(status_code=400, detail="No Resolume configuration. Add one in Settings.")
     return cfg
@@ -355,16 +610,8 @@ async def proxy_to_resolume(method: str, path: str, user_id: str, body: dict = N
     """Proxy request to user's Resolume instance."""
     cfg = await get_user_config(user_id)
     
-    # Build URL (ngrok uses HTTPS on 443)
-    host, port = cfg["host"], cfg.get("port", 443)
-    base = f"https://{host}" if port == 443 else f"http://{host}:{port}"
-    url = f"{base}/api/v1{path}"
-    
-    headers = {
-        "ngrok-skip-browser-warning": "true",
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
+    url = f"{resolume_base_url(cfg['host'], cfg.get('port', 443))}/api/v1{path}"
+    headers = RESOLUME_HEADERS
     
     logger.info(f"Proxy {method} -> {url}")
     
@@ -385,7 +632,7 @@ async def proxy_to_resolume(method: str, path: str, user_id: str, body: dict = N
             raise HTTPException(status_code=resp.status_code, detail=f"Resolume: {resp.text}")
         
         try:
-            return resp.json()
+            return orjson.loads(resp.content)
         except ValueError:
             return {"success": True}
     except HTTPException:
@@ -394,6 +641,29 @@ async def proxy_to_resolume(method: str, path: str, user_id: str, body: dict = N
         logger.error(f"Proxy error: {e}")
         raise HTTPException(status_code=502, detail=f"Cannot reach Resolume: {e}")
 
+async def set_parameter(user_id: str, key: str, path: str, extract, value, name: str):
+    """PUT a parameter value by id, resolving (and caching) the id via GET `path`."""
+    cache_key = (user_id, key)
+    param_id = _param_id_cache.get(cache_key)
+    cached = param_id is not None
+    
+    if not cached:
+        param_id = extract(await proxy_to_resolume("GET", path, user_id))
+        if not param_id:
+            raise HTTPException(status_code=500, detail=f"Cannot find {name} parameter")
+        _param_id_cache[cache_key] = param_id
+    
+    try:
+        await proxy_to_resolume("PUT", f"/parameter/by-id/{param_id}", user_id, {"value": value})
+    except HTTPException as e:
+        if e.status_code != 404:
+            raise
+        _param_id_cache.pop(cache_key, None)
+        if not cached:
+            raise
+        # Composition was reloaded since the id was cached; resolve it again
+        await set_parameter(user_id, key, path, extract, value, name)
+
 # =============================================================================
 # RESOLUME STATUS & CONTROL ENDPOINTS
 # =============================================================================
@@ -401,23 +671,15 @@ async def proxy_to_resolume(method: str, path: str, user_id: str, body: dict = N
 @app.get("/api/resolume/status")
 async def get_status(current_user: dict = Depends(get_current_user)):
     """Check Resolume connection status."""
-    user_id = current_user["sub"]
-    cfg = await db.db.configurations.find_one(
-        {"user_id": user_id, "is_active": True},
-        {"_id": 0}
-    )
+    cfg = await config_loader.load(current_user["sub"])
     
     if not cfg:
         return {"connected": False, "config": None, "message": "No configuration set"}
     
     # Try to connect
     try:
-        host, port = cfg["host"], cfg.get("port", 443)
-        base = f"https://{host}" if port == 443 else f"http://{host}:{port}"
-        resp = await http.client.get(
-            f"{base}/api/v1/composition",
-            headers={"ngrok-skip-browser-warning": "true"}
-        )
+        base = resolume_base_url(cfg["host"], cfg.get("port", 443))
+        resp = await http.client.get(f"{base}/api/v1/composition", headers=NGROK_HEADERS)
         connected = resp.status_code == 200
     except Exception:
         connected = False
@@ -441,16 +703,11 @@ async def get_bpm(current_user: dict = Depends(get_current_user)):
 @app.post("/api/resolume/composition/tempo/bpm")
 async def set_bpm(bpm: float = 120, current_user: dict = Depends(get_current_user)):
     """Set BPM using Resolume's parameter-by-id API."""
-    user_id = current_user["sub"]
-    
-    # Get tempo parameter ID
-    comp = await proxy_to_resolume("GET", "/composition", user_id)
-    tempo_id = comp.get("tempocontroller", {}).get("tempo", {}).get("id")
-    
-    if not tempo_id:
-        raise HTTPException(status_code=500, detail="Cannot find tempo parameter")
-    
-    await proxy_to_resolume("PUT", f"/parameter/by-id/{tempo_id}", user_id, {"value": bpm})
+    await set_parameter(
+        current_user["sub"], "tempo", "/composition",
+        lambda comp: comp.get("tempocontroller", {}).get("tempo", {}).get("id"),
+        bpm, "tempo"
+    )
     return {"success": True, "value": bpm}
 
 @app.get("/api/resolume/composition/layers/{layer}/video/opacity")
@@ -463,32 +720,28 @@ async def get_opacity(layer: int, current_user: dict = Depends(get_current_user)
 @app.post("/api/resolume/composition/layers/{layer}/video/opacity")
 async def set_opacity(layer: int, opacity: float = 1.0, current_user: dict = Depends(get_current_user)):
     """Set layer opacity using parameter-by-id API."""
-    user_id = current_user["sub"]
-    
-    result = await proxy_to_resolume("GET", f"/composition/layers/{layer}", user_id)
-    opacity_id = result.get("video", {}).get("opacity", {}).get("id")
-    
-    if not opacity_id:
-        raise HTTPException(status_code=500, detail="Cannot find opacity parameter")
-    
-    await proxy_to_resolume("PUT", f"/parameter/by-id/{opacity_id}", user_id, {"value": opacity})
+    await set_parameter(
+        current_user["sub"], f"layer/{layer}/opacity", f"/composition/layers/{layer}",
+        lambda result: result.get("video", {}).get("opacity", {}).get("id"),
+        opacity, "opacity"
+    )
     return {"success": True, "value": opacity}
 
 @app.get("/api/resolume/composition/layers/{layer}/clips")
 async def get_clips(layer: int, current_user: dict = Depends(get_current_user)):
     """Get clips for a layer."""
     result = await proxy_to_resolume("GET", f"/composition/layers/{layer}", current_user["sub"])
-    clips = result.get("clips", [])
-    clip_list = [
-        {
+    clip_list = []
+    for i, c in enumerate(result.get("clips", [])[:9]):
+        name = c.get("name") or {}
+        connected = c.get("connected") or {}
+        clip_list.append({
             "id": i + 1,
-            "name": c.get("name", {}).get("value", ""),
-            "isConnected": c.get("connected", {}).get("value", False) or c.get("connected", {}).get("value", "") in ["Connected", "Connected & previewing"],
+            "name": name.get("value", ""),
+            "isConnected": connected.get("value") in ("Connected", "Connected & previewing"),
             "thumbnailUrl": "",
             "transport": c.get("transport", {})
-        }
-        for i, c in enumerate(clips[:9])
-    ]
+        })
     return {"clips": clip_list}
 
 @app.post("/api/resolume/composition/layers/{layer}/clips/{clip}/connect")
@@ -500,15 +753,11 @@ async def trigger_clip(layer: int, clip: int, current_user: dict = Depends(get_c
 @app.post("/api/resolume/composition/layers/{layer}/clips/{clip}/transport/position")
 async def set_position(layer: int, clip: int, position: float = 0, current_user: dict = Depends(get_current_user)):
     """Set clip playback position using parameter-by-id API."""
-    user_id = current_user["sub"]
-    
-    result = await proxy_to_resolume("GET", f"/composition/layers/{layer}/clips/{clip}", user_id)
-    pos_id = result.get("transport", {}).get("position", {}).get("id")
-    
-    if not pos_id:
-        raise HTTPException(status_code=500, detail="Cannot find position parameter")
-    
-    await proxy_to_resolume("PUT", f"/parameter/by-id/{pos_id}", user_id, {"value": position})
+    await set_parameter(
+        current_user["sub"], f"clip/{layer}/{clip}/position", f"/composition/layers/{layer}/clips/{clip}",
+        lambda result: result.get("transport", {}).get("position", {}).get("id"),
+        position, "position"
+    )
     return {"success": True, "value": position}
 
 @app.post("/api/resolume/composition/layers/{layer}/clear")
@@ -521,19 +770,45 @@ async def clear_layer(layer: int, current_user: dict = Depends(get_current_user)
 async def get_thumbnail(layer: int, clip: int):
     """Proxy thumbnail image from Resolume."""
     # Get any active config (thumbnails don't need auth)
-    cfg = await db.db.configurations.find_one({"is_active": True}, {"_id": 0})
+    cfg = await db.db.configurations.find_one({"is_active": True}, {"_id": 0, "host": 1, "port": 1})
     if not cfg:
         raise HTTPException(status_code=400, detail="No configuration")
     
     host, port = cfg["host"], cfg.get("port", 443)
-    base = f"https://{host}" if port == 443 else f"http://{host}:{port}"
+    base = resolume_base_url(host, port)
     url = f"{base}/api/v1/composition/layers/{layer}/clips/{clip}/thumbnail"
     
+    cache_key = (host, layer, clip)
+    cached = _thumbnail_cache.get(cache_key)
+    if cached is not None:
+        content, media_type = cached
+        return Response(content=content, media_type=media_type)
+    
     try:
-        resp = await http.client.get(url, headers={"ngrok-skip-browser-warning": "true"})
-        if resp.status_code == 200:
-            return Response(content=resp.content, media_type=resp.headers.get("content-type", "image/png"))
-        raise HTTPException(status_code=resp.status_code, detail="Thumbnail not found")
+        req = http.client.build_request("GET", url, headers=NGROK_HEADERS)
+        resp = await http.client.send(req, stream=True)
+        if resp.status_code != 200:
+            await resp.aclose()
+            raise HTTPException(status_code=resp.status_code, detail="Thumbnail not found")
+        media_type = resp.headers.get("content-type", "image/png")
+        content_length = resp.headers.get("content-length", "")
+        cacheable = content_length.isdigit() and int(content_length) <= THUMBNAIL_CACHE_MAX_ITEM
+        
+        async def stream_body():
+            # Only small bodies of known size are collected; the rest pass straight through
+            buf = bytearray() if cacheable else None
+            try:
+                async for chunk in resp.aiter_bytes(65536):
+                    if buf is not None:
+                        buf += chunk
+                    yield chunk
+            finally:
+                await resp.aclose()
+            # Only reached when the full body was sent
+            if buf is not None:
+                _thumbnail_cache[cache_key] = (bytes(buf), media_type)
+        
+        return StreamingResponse(stream_body(), media_type=media_type)
     except HTTPException:
         raise
     except Exception as e:
@@ -543,9 +818,7 @@ async def get_thumbnail(layer: int, clip: int):
 # DEBUG ENDPOINTS (Development only)
 # =============================================================================
 
-@app.get("/api/debug/routes")
-def list_routes():
-    """List all registered routes (for debugging)."""
+def build_routes_snapshot() -> dict:
     return {
         "routes": [
             {"path": r.path, "methods": list(r.methods - {"HEAD", "OPTIONS"})}
@@ -554,4 +827,10 @@ def list_routes():
         ]
     }
 
+if config.DEBUG_ROUTES:
+    @app.get("/api/debug/routes")
+    def list_routes():
+        """List all registered routes (for debugging)."""
+        return app.state.routes_snapshot
+
 logger.info("✅ Resofleur API ready")